@@ -1,29 +1,165 @@
 import shutil
 import sys
+import functools
 import os
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, \
     QListWidget, \
     QComboBox, QTableWidget, QTableWidgetItem, QCheckBox, QMessageBox, QFileDialog, QDialog, QDialogButtonBox, \
-    QListWidgetItem, QTextEdit, QScrollArea, QFormLayout, QInputDialog
-from PyQt5.QtCore import Qt
+    QTextEdit, QScrollArea, QFormLayout, QInputDialog
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QStandardItemModel, QStandardItem
 from docxtpl import DocxTemplate
 from num2words import num2words
 from babel.dates import format_date, format_datetime
 from datetime import datetime
 import pandas as pd
+from openpyxl import load_workbook
 import pathlib
-from transliterate import translit
+
+#Оцінка словами, кешується між колонками та запусками
+@functools.lru_cache(maxsize=None, typed=True)
+def _num2words_uk(value):
+    return num2words(value, lang='uk')
+
+#Папки програми
+_MODULE_DIR = pathlib.Path(__file__).resolve().parent
+_EXAMPLE_DIR = _MODULE_DIR / "Приклади"
+_EXAMPLE_DIR_STR = os.fspath(_EXAMPLE_DIR)  #Для шляхів шаблонів без створення Path на кожен файл
+_OUTPUT_DIR = _MODULE_DIR.parent / "Вихід"
+
+#Таблиця транслітерації українських літер (нижній регістр) в латиницю
+_UK_TRANSLIT = str.maketrans({
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'h', 'ґ': 'g', 'д': 'd', 'е': 'e', 'є': 'ie', 'ж': 'zh', 'з': 'z',
+    'и': 'y', 'і': 'i', 'ї': 'i', 'й': 'i', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p',
+    'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'kh', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh',
+    'щ': 'shch', 'ь': '', 'ю': 'iu', 'я': 'ia', "'": '', 'ʼ': '', '’': '',
+})
+
+#Поля шаблону та колонки екселя з яких вони заповнюються
+_TEMPLATE_COLUMNS = {
+    "kod1": "Назва групи",
+    "nomer": "Реєстраційний номер",
+    "name1": "Прізвище",
+    "name2": "Ім'я",
+    "name3": "По батькові",
+    "adresa": "Адреса",
+    "mob_number": "Контактний номер",
+    "form_b": "Бютжет чи контракт",
+    "gr_num": "Номер групи",
+    "stupen": "ОКР",
+    "spc": "Спеціальність",
+    "num_pass": "ДПО.Номер",
+    "seria_pass": "ДПО.Серія",
+    "vydan": "ДПО.Ким виданий",
+    "nakaz": "Наказ про зарахування",
+    "ser_sv": "Серія документа",
+    "num_sv": "Номер документа",
+    "kym_vydany": "Ким видано",
+    "zno_num": "Номер зно",
+    "zno_rik": "Рік зно",
+    "forma_nav": "Форма навчання",
+    "doc_of": "ДПО",
+    "typ_doc": "Тип документа",
+    "typ_doc_dod": "Додаток до типу документу",
+    "prot_num": "Номер протоколу",
+}
+
+#Поля шаблону з датами (dd.mm.yyyy) та їх колонки в екселі
+_DATE_COLUMNS = {
+    "data_sv": "Дата видачі документа",
+    "data_prot": "Дата протоколу",
+    "zayava_vid": "Дата подачі заяви",
+    "data": "ДПО.Дата видачі",
+    "data_vstup": "Дата вступу",
+    "data_nakaz": "Дата наказу",
+}
+
+#Поля з кількома значеннями на весь список, зберігаються як category
+_CATEGORY_COLUMNS = ("forma_nav", "stupen", "spc", "typ_doc", "form_b", "doc_of")
+
+#Крапки та пробіли в назвах колонок з оцінками стають "_"
+_SCORE_NORM = str.maketrans({'.': '_', ' ': '_'})
+
+#Ключі контексту шаблону: пробіли стають "_", крапки та коми прибираються
+_KEY_NORM = str.maketrans({' ': '_', '.': None, ',': None})
+
+#Копіювання шаблону (shutil сам використовує швидке копіювання ядра), повертає куди скопійовано
+def _copy_template(src, dst):
+    shutil.copyfile(src, dst)
+    return dst
+
+#Вміст шаблонів {шлях: bytes}, передається кожному процесу-воркеру один раз при старті
+_template_bytes = {}
+
+def _init_render_worker(template_bytes):
+    global _template_bytes
+    _template_bytes = template_bytes
+
+#Рендер одного документа в процесі-воркері
+def _render_one(template_path, context, output_path):
+    #render змінює документ, тому кожен рендер з чистої копії в пам'яті.
+    #Не deepcopy розібраного шаблону: __getattr__ DocxTemplate веде до self.docx і копія падає з RecursionError
+    doc = DocxTemplate(io.BytesIO(_template_bytes[template_path]))
+    doc.render(context)
+    #Zip збирається в пам'яті і пишеться на диск одним записом
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    with open(output_path, 'wb', buffering=1 << 20) as f:
+        f.write(buffer.getbuffer())
+
+#Сигнали фонових задач (віджети оновлюються тільки в головному потоці)
+class TaskSignals(QObject):
+    finished = pyqtSignal(object)
+    error = pyqtSignal(str)
+    failed = pyqtSignal(object)  #(файл, текст помилки), щоб відкинути помилку вже заміненого файлу
+    message = pyqtSignal(str)
+
+#Фонове читання всіх листів екселя
+class ExcelLoadTask(QRunnable):
+    def __init__(self, excel_path):
+        super().__init__()
+        self.excel_path = excel_path
+        self.signals = TaskSignals()
+
+    def run(self):
+        try:
+            mtime = os.path.getmtime(self.excel_path)
+            sheets = pd.read_excel(self.excel_path, sheet_name=None)
+        except Exception as e:
+            self.signals.failed.emit((self.excel_path, str(e)))
+        else:
+            self.signals.finished.emit((self.excel_path, mtime, sheets))
+
+#Фонова генерація документів
+class GenerateTask(QRunnable):
+    def __init__(self, create_documents, df, word_templates, output_dir):
+        super().__init__()
+        self.create_documents = create_documents
+        self.df = df
+        self.word_templates = list(word_templates)  #Знімок, щоб зміни в ГУІ не впливали на генерацію
+        self.output_dir = output_dir
+        self.signals = TaskSignals()
+
+    def run(self):
+        try:
+            self.create_documents(self.df, self.word_templates, self.output_dir, self.signals.message.emit)
+        except Exception as e:
+            self.signals.error.emit(str(e))
+        else:
+            self.signals.finished.emit(self.output_dir)
 
 #Вікно вибору оцінок
 class ScoreColumnSelectorDialog(QDialog):
-    def __init__(self, excel_path, selected_sheet, parent=None):
+    def __init__(self, df, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Виберіть поля з оцінками")
         self.selected_columns = []
 
-        # Читати ексель для додати колонки з числами
+        # Колонки з числами з вже прочитаного листа
         try:
-            df = pd.read_excel(excel_path, sheet_name=selected_sheet)
             numeric_columns = df.select_dtypes(include=['int', 'float']).columns.tolist()
 
             layout = QVBoxLayout(self)
@@ -31,9 +167,9 @@ class ScoreColumnSelectorDialog(QDialog):
             self.list_widget = QListWidget(self)
             self.list_widget.setSelectionMode(QListWidget.MultiSelection)
 
-            for column in numeric_columns:
-                item = QListWidgetItem(column)
-                self.list_widget.addItem(item)
+            self.list_widget.setUpdatesEnabled(False)
+            self.list_widget.addItems([str(column) for column in numeric_columns])
+            self.list_widget.setUpdatesEnabled(True)
 
             layout.addWidget(self.list_widget)
 
@@ -55,7 +191,7 @@ class ScoreColumnSelectorDialog(QDialog):
         try:
             transliterated_columns = {}
             for column in self.selected_columns:
-                transliterated_name = translit(column, 'uk', reversed=True).lower()
+                transliterated_name = column.lower().translate(_UK_TRANSLIT)
                 transliterated_columns[column] = transliterated_name
             return transliterated_columns
         except Exception as e:
@@ -71,6 +207,7 @@ class ColumnMappingDialog(QDialog):
         self.df = df.copy()  # Make a copy of the DataFrame to avoid modifying the original
         self.required_columns = required_columns.copy()  # Copy the required columns
         self.column_mappings = column_mappings if column_mappings else {}
+        self._preview_df = self.df.head(100)  #Для превю вистачає перших рядків
 
         # Initialize combo_boxes attribute to store references to combo boxes
         self.combo_boxes = {}
@@ -87,11 +224,16 @@ class ColumnMappingDialog(QDialog):
         # Create form layout for mappings
         form_layout = QFormLayout()
 
+        #Одна модель зі списком колонок на всі випадаючі списки
+        columns_model = QStandardItemModel(self)
+        columns_model.appendRow(QStandardItem("Пропустити"))
+        for column in self.df.columns:
+            columns_model.appendRow(QStandardItem(str(column)))  #Додати з датафрейму
+
         for required_column in self.required_columns:
             label = QLabel(required_column)
             combo_box = QComboBox()
-            combo_box.addItem("Пропустити")
-            combo_box.addItems(self.df.columns)  #Додати з датафрейму
+            combo_box.setModel(columns_model)
             combo_box.setCurrentText(self.column_mappings.get(required_column, "Пропустити"))  #Примінити автоспівставлення
             form_layout.addRow(label, combo_box)
             self.combo_boxes[required_column] = combo_box
@@ -104,6 +246,8 @@ class ColumnMappingDialog(QDialog):
         self.preview_table = QTableWidget(self)
         self.update_preview_table()
         main_layout.addWidget(self.preview_table)
+        for combo_box in self.combo_boxes.values():
+            combo_box.currentTextChanged.connect(self.update_preview_headers)
 
         #Підтвердити та Відмінити кнопки
         buttons_layout = QHBoxLayout()
@@ -134,12 +278,14 @@ class ColumnMappingDialog(QDialog):
 
     def accept(self):
         try:
+            seen = set()  #Вже призначені колонки
             for required_column, combo_box in self.combo_boxes.items():
                 selected_column = combo_box.currentText()
                 if selected_column != "Пропустити" and selected_column in self.df.columns:
-                    if selected_column in self.column_mappings.values() and self.column_mappings.get(required_column) != selected_column:
+                    if selected_column in seen:
                         QMessageBox.warning(self, "Дублювання колонок", f"Колонка {selected_column} вже має призначення.")
                         return
+                    seen.add(selected_column)
                     self.column_mappings[required_column] = selected_column
             super(ColumnMappingDialog, self).accept()
         except Exception as e:
@@ -155,20 +301,27 @@ class ColumnMappingDialog(QDialog):
     #Оновлення превю там же
     def update_preview_table(self):
         self.preview_table.clear()
-        self.preview_table.setRowCount(self.df.shape[0])
-        self.preview_table.setColumnCount(self.df.shape[1])
-        preview_df = self.df.copy()
-        for required_column, combo_box in self.combo_boxes.items():
-            selected_column = combo_box.currentText()
-            if selected_column != "Пропустити":
-                preview_df.rename(columns={required_column: selected_column}, inplace=True)
-
-        self.preview_table.setHorizontalHeaderLabels(preview_df.columns)
+        self.preview_table.setRowCount(self._preview_df.shape[0])
+        self.preview_table.setColumnCount(self._preview_df.shape[1])
+        self.update_preview_headers()
 
-        for i in range(preview_df.shape[0]):
-            for j in range(preview_df.shape[1]):
-                item = QTableWidgetItem(str(preview_df.iloc[i, j]))
-                self.preview_table.setItem(i, j, item)
+        #Один раз перевести в рядки, без iloc на кожну клітинку
+        values = self._preview_df.astype(str).to_numpy()
+        self.preview_table.setUpdatesEnabled(False)
+        try:
+            for i in range(values.shape[0]):
+                for j in range(values.shape[1]):
+                    self.preview_table.setItem(i, j, QTableWidgetItem(values[i, j]))
+        finally:
+            self.preview_table.setUpdatesEnabled(True)
+
+    #При зміні співставлення оновлюються тільки заголовки превю
+    def update_preview_headers(self):
+        mapping = {required_column: combo_box.currentText() for required_column, combo_box in self.combo_boxes.items()
+                   if combo_box.currentText() != "Пропустити"}
+        #Перейменовуються тільки заголовки, без копії DataFrame
+        self.preview_table.setHorizontalHeaderLabels([str(mapping.get(column, column))
+                                                      for column in self._preview_df.columns])
 
 #Основне вікно
 class DocumentGeneratorApp(QMainWindow):
@@ -187,13 +340,19 @@ class DocumentGeneratorApp(QMainWindow):
 
         self.excel_path = None
         self.word_templates = []
+        self._custom_templates = []  #Свої приклади, додаються до кожної генерації
         self.sheet_name = None
         self.include_scores = False
         self.selected_score_columns = []
         self.column_mappings = {}
-        self.output_dir = pathlib.Path(__file__).resolve().parents[1] / "Вихід"
-        self.example_dir = pathlib.Path(__file__).resolve().parents[0] / "Приклади"
+        self.output_dir = _OUTPUT_DIR
+        self.example_dir = _EXAMPLE_DIR
         self.expected_sheets = []
+        self._template_cache = None  #Шаблони з папки прикладів {назва: шлях}
+        self._template_cache_mtime = None
+        self._sheet_cache = {}  #Листи екселя {(шлях, mtime, лист): DataFrame}
+        self._generating = False  #Іде фонова генерація документів
+        self.thread_pool = QThreadPool.globalInstance()
 
         self.setup_gui()
 
@@ -220,9 +379,9 @@ class DocumentGeneratorApp(QMainWindow):
 
         layout.addWidget(self.preview_table)
 
-        map_columns_button = QPushButton("Співставлення колонок", self)
-        map_columns_button.clicked.connect(self.map_columns)
-        layout.addWidget(map_columns_button)
+        self.map_columns_button = QPushButton("Співставлення колонок", self)
+        self.map_columns_button.clicked.connect(self.map_columns)
+        layout.addWidget(self.map_columns_button)
 
         template_label = QLabel("Виберіть Шаблони документів", self)
         layout.addWidget(template_label)
@@ -251,9 +410,9 @@ class DocumentGeneratorApp(QMainWindow):
         self.select_score_columns_button.clicked.connect(self.select_score_columns)
         layout.addWidget(self.select_score_columns_button)
 
-        generate_button = QPushButton("Створення документів", self)
-        generate_button.clicked.connect(self.generate_documents)
-        layout.addWidget(generate_button)
+        self.generate_button = QPushButton("Створення документів", self)
+        self.generate_button.clicked.connect(self.generate_documents)
+        layout.addWidget(self.generate_button)
 
         self.log_window.setReadOnly(True)
         layout.addWidget(self.log_window)
@@ -265,8 +424,7 @@ class DocumentGeneratorApp(QMainWindow):
 
         #Получить шаблони з example_dir та додати в template_listbox
         try:
-            example_dir = pathlib.Path(__file__).resolve().parents[0] / "Приклади"
-            standard_templates = [file.stem for file in example_dir.glob("*.docx") if file.is_file()]
+            standard_templates = list(self._standard_templates())
             self.template_listbox.addItems(standard_templates)
 
             # Додати свої шаблони та перемістити
@@ -278,6 +436,21 @@ class DocumentGeneratorApp(QMainWindow):
         except Exception as e:
             self.log_message(f"Error fetching templates: {e}")
 
+    #Шаблони з папки прикладів, перечитуються тільки коли папка змінилась
+    def _standard_templates(self):
+        try:
+            mtime = os.stat(_EXAMPLE_DIR).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        if self._template_cache is None or mtime != self._template_cache_mtime:
+            with os.scandir(_EXAMPLE_DIR) as entries:
+                self._template_cache = {
+                    os.path.splitext(entry.name)[0]: entry.path for entry in entries
+                    if entry.name.lower().endswith('.docx') and entry.is_file(follow_symlinks=False)
+                }
+            self._template_cache_mtime = mtime
+        return self._template_cache
+
     #Для консолі
     def log_message(self, message):
         self.log_window.append(message)
@@ -289,23 +462,74 @@ class DocumentGeneratorApp(QMainWindow):
                                                   "Excel Files (*.xlsx)")
             if file:
                 self.excel_path = file
+                self._sheet_cache = {}
                 self.log_message(f"Вибраний Excel файл: {self.excel_path}")
                 if not self.check_expected_sheets():
                     self.excel_path = None
                     return
                 self.show_excel_preview()
-                self.update_sheet_dropdown()
+
+                #Листи попереднього файлу прибрати, дії з листом недоступні до кінця читання
+                self.sheet_dropdown.blockSignals(True)
+                self.sheet_dropdown.clear()
+                self.sheet_dropdown.addItem("Виберіть лист")
+                self.sheet_dropdown.blockSignals(False)
+                self.preview_table.clear()
+                self.preview_table.setRowCount(0)
+                self.preview_table.setColumnCount(0)
+                self._set_sheet_actions_enabled(False)
+
+                #Читання у фоні, список листів оновиться коли дані будуть готові
+                task = ExcelLoadTask(self.excel_path)
+                task.signals.finished.connect(self._on_excel_loaded)
+                task.signals.failed.connect(self._on_excel_load_error)
+                self.thread_pool.start(task)
+                self.log_message("Завантаження даних...")
         except Exception as e:
             if 'Worksheet named "' in str(e) and ' not found' in str(e):
                 pass
             else:
                 QMessageBox.critical(self, "Error", f"Під час читання файлу Excel сталася помилка: {e}")
 
+    def _on_excel_loaded(self, result):
+        excel_path, mtime, sheets = result
+        if excel_path != self.excel_path:
+            return  #Поки читалось, вибрали інший файл
+        self._sheet_cache.update({(excel_path, mtime, sheet_name): df for sheet_name, df in sheets.items()})
+        self._set_sheet_actions_enabled(True)
+        self.update_sheet_dropdown()
+
+    def _on_excel_load_error(self, result):
+        excel_path, error = result
+        if excel_path != self.excel_path:
+            return  #Помилка файлу, який вже замінили
+        self._set_sheet_actions_enabled(True)
+        QMessageBox.critical(self, "Error", f"Під час читання файлу Excel сталася помилка: {error}")
+
+    #Вибір листа та дії з ним (співставлення, оцінки, генерація)
+    def _set_sheet_actions_enabled(self, enabled):
+        self.sheet_dropdown.setEnabled(enabled)
+        self.map_columns_button.setEnabled(enabled)
+        self.select_score_columns_button.setEnabled(enabled and self.include_scores)
+        self.generate_button.setEnabled(enabled and not self._generating)
+
+    #Лист з кешу, файл перечитується тільки якщо змінився на диску
+    def _load_sheet(self, sheet_name):
+        key = (self.excel_path, os.path.getmtime(self.excel_path), sheet_name)
+        df = self._sheet_cache.get(key)
+        if df is None:
+            df = self._sheet_cache[key] = pd.read_excel(self.excel_path, sheet_name=sheet_name)
+        return df
+
     #Перевірити листи
     def check_expected_sheets(self):
         try:
-            #Получить листи
-            self.expected_sheets = pd.ExcelFile(self.excel_path).sheet_names
+            #Получить листи, без розбору самих даних
+            workbook = load_workbook(self.excel_path, read_only=True, keep_links=False)
+            try:
+                self.expected_sheets = [worksheet.title for worksheet in workbook.worksheets]  #Без листів-діаграм
+            finally:
+                workbook.close()
             return True
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Під час читання файлу Excel сталася помилка: {e}")
@@ -331,15 +555,22 @@ class DocumentGeneratorApp(QMainWindow):
         selected_sheet = self.sheet_dropdown.currentText()
         if selected_sheet != "Виберіть лист":
             try:
-                df = pd.read_excel(self.excel_path, sheet_name=selected_sheet)
-                self.preview_table.setRowCount(df.shape[0])
-                self.preview_table.setColumnCount(df.shape[1])
-                self.preview_table.setHorizontalHeaderLabels(df.columns)
+                df = self._load_sheet(selected_sheet).head(200)  #В превю достатньо перших рядків
+                values = df.astype(str).to_numpy()
+                rows, cols = values.shape
 
-                for i in range(df.shape[0]):
-                    for j in range(df.shape[1]):
-                        item = QTableWidgetItem(str(df.iloc[i, j]))
-                        self.preview_table.setItem(i, j, item)
+                self.preview_table.setUpdatesEnabled(False)
+                self.preview_table.blockSignals(True)
+                try:
+                    self.preview_table.setRowCount(rows)
+                    self.preview_table.setColumnCount(cols)
+                    self.preview_table.setHorizontalHeaderLabels(df.columns)
+                    for i in range(rows):
+                        for j in range(cols):
+                            self.preview_table.setItem(i, j, QTableWidgetItem(values[i, j]))
+                finally:
+                    self.preview_table.blockSignals(False)
+                    self.preview_table.setUpdatesEnabled(True)
 
             except Exception as e:
                 if 'Worksheet named' in str(e):
@@ -354,7 +585,7 @@ class DocumentGeneratorApp(QMainWindow):
             return
 
         try:
-            df = pd.read_excel(self.excel_path, sheet_name=selected_sheet)
+            df = self._load_sheet(selected_sheet)
             required_columns = [
                 "Назва групи", "Реєстраційний номер", "Прізвище", "Ім'я", "По батькові", "Адреса", "Контактний номер",
                 "Бютжет чи контракт", "Номер групи", "ОКР", "Спеціальність", "ДПО.Номер", "ДПО.Серія",
@@ -378,8 +609,9 @@ class DocumentGeneratorApp(QMainWindow):
     #Галочка для вибору оцінок
     def toggle_include_scores(self, state):
         self.include_scores = state == Qt.Checked
-        self.select_score_columns_button.setEnabled(self.include_scores)
-        if self.include_scores:
+        loaded = self.sheet_dropdown.isEnabled()  #Поки ексель читається, колонки вибрати не можна
+        self.select_score_columns_button.setEnabled(self.include_scores and loaded)
+        if self.include_scores and loaded:
             self.select_score_columns()
 
     def select_score_columns(self):
@@ -389,7 +621,7 @@ class DocumentGeneratorApp(QMainWindow):
 
         selected_sheet = self.sheet_dropdown.currentText()
         try:
-            dialog = ScoreColumnSelectorDialog(self.excel_path, selected_sheet, self)
+            dialog = ScoreColumnSelectorDialog(self._load_sheet(selected_sheet), self)
             if dialog.exec_() == QDialog.Accepted:
                 self.selected_score_columns = dialog.selected_columns
                 transliterated_columns = dialog.get_transliterated_columns()
@@ -397,7 +629,7 @@ class DocumentGeneratorApp(QMainWindow):
                 formatted_columns = []
                 for col in self.selected_score_columns:
                     #Підготовка нових колонок для шаблону
-                    formatted_col = col.replace('.',' ').lower().replace(' ', '_').rstrip('_')
+                    formatted_col = col.lower().translate(_SCORE_NORM).rstrip('_')
                     formatted_columns.append(formatted_col)
 
                 self.selected_score_columns = formatted_columns
@@ -431,29 +663,25 @@ class DocumentGeneratorApp(QMainWindow):
 
                 self.log_message(f"Вибрані приклади: {', '.join(custom_templates)}")
 
-                #Стандартна папка для прикладів
-                example_dir = pathlib.Path(__file__).resolve().parents[0] / "Приклади"
-
-                #Створити якщо нема
-                example_dir.mkdir(parents=True, exist_ok=True)
+                #Створити стандартну папку для прикладів якщо нема
+                _EXAMPLE_DIR.mkdir(parents=True, exist_ok=True)
 
-                #Скопіювати вибраний приклад в папку
+                #Скопіювати вибрані приклади в папку паралельно
+                sources = []
                 for template in custom_templates:
-                    template_path = pathlib.Path(template)
-                    if template_path.exists():
-                        template_name = template_path.name
-                        destination = example_dir / template_name
-                        shutil.copyfile(template, destination)
-                        self.log_message(f"Успішно скопійовано {template_name} в папку прикладів.")
+                    if pathlib.Path(template).exists():
+                        sources.append(template)
                     else:
                         self.log_message(f"Файл {template} не існує або доступ закритий.")
+                destinations = [_EXAMPLE_DIR / pathlib.Path(template).name for template in sources]
+                with ThreadPoolExecutor(max_workers=4) as executor:
+                    for destination in executor.map(_copy_template, sources, destinations):
+                        self.log_message(f"Успішно скопійовано {destination.name} в папку прикладів.")
+                self._template_cache = None
 
-                #Почистити
-                self.word_templates.clear()
-
-                #Додати
-                self.word_templates.extend(
-                    str(example_dir / pathlib.Path(template).name) for template in custom_templates)
+                #Замінити попередні свої приклади
+                self._custom_templates = [f"{_EXAMPLE_DIR_STR}{os.sep}{destination.name}" for destination in destinations]
+                self.word_templates = list(self._custom_templates)
 
                 self.log_message("Приклади імпортовано.")
 
@@ -470,7 +698,7 @@ class DocumentGeneratorApp(QMainWindow):
     def unselect_all_templates(self):
         self.template_listbox.clearSelection()
         self.word_templates.clear()
-        self.word_templates = []
+        self._custom_templates.clear()
         self.log_message("Виділення знято.")
         self.populate_template_list()
 
@@ -487,8 +715,12 @@ class DocumentGeneratorApp(QMainWindow):
                 return
 
             selected_templates = [item.text() for item in selected_items]
-            self.word_templates.extend([str(self.example_dir / f"{template}.docx") for template in selected_templates if
-                                        template != "Свій приклад документу"])
+            #Список збирається заново на кожну генерацію, без дублів від попередніх запусків
+            #Справжній шлях з папки прикладів (розширення може бути .DOCX)
+            standard_templates = self._standard_templates()
+            self.word_templates = [standard_templates.get(template, f"{_EXAMPLE_DIR_STR}{os.sep}{template}.docx")
+                                   for template in selected_templates if template != "Свій приклад документу"]
+            self.word_templates += [template for template in self._custom_templates if template not in self.word_templates]
 
             if not self.word_templates:
                 self.log_message("Шаблон не вибрано: виберіть дійсний шаблон документа.")
@@ -496,7 +728,7 @@ class DocumentGeneratorApp(QMainWindow):
                 return
 
             selected_sheet = self.sheet_dropdown.currentText()
-            df = pd.read_excel(self.excel_path, sheet_name=selected_sheet).fillna(' ')
+            df = self._load_sheet(selected_sheet).fillna(' ')
 
             if self.include_scores and not self.selected_score_columns:
                 self.log_message("Не вибрано стовпців оцінок: виберіть стовпці оцінок для включення.")
@@ -507,19 +739,31 @@ class DocumentGeneratorApp(QMainWindow):
             self.log_message("Генерація документів...")
             output_dir = QFileDialog.getExistingDirectory(self, "Виберіть папку для збереження документів")
             if output_dir:
-                self.create_documents(df, output_dir)
-                self.log_message(f"Документи успішно створено в {output_dir}")
+                task = GenerateTask(self.create_documents, df, self.word_templates, output_dir)
+                task.signals.message.connect(self.log_message)
+                task.signals.finished.connect(self._on_documents_created)
+                task.signals.error.connect(self._on_generate_error)
+                self._generating = True
+                self.generate_button.setEnabled(False)
+                self.thread_pool.start(task)
         except Exception as e:
-            self.log_message(f"Помилка під час створення документів: {e}")
-            QMessageBox.critical(self, "Помилка", f"Під час створення документів сталася помилка: {e}")
+            self._on_generate_error(str(e))
+
+    def _on_documents_created(self, output_dir):
+        self._generating = False
+        self.generate_button.setEnabled(self.sheet_dropdown.isEnabled())
+        self.log_message(f"Документи успішно створено в {output_dir}")
+
+    def _on_generate_error(self, error):
+        self._generating = False
+        self.generate_button.setEnabled(self.sheet_dropdown.isEnabled())
+        self.log_message(f"Помилка під час створення документів: {error}")
+        QMessageBox.critical(self, "Помилка", f"Під час створення документів сталася помилка: {error}")
 
     #Логіка перевірки прикладів
     def check_standard_templates(self):
         try:
-            example_dir = pathlib.Path(__file__).resolve().parents[0] / "Приклади"
-            standard_templates_path = example_dir.glob("*.docx")
-            available_templates = [str(template_path) for template_path in standard_templates_path if
-                                   template_path.is_file()]
+            available_templates = list(self._standard_templates().values())
 
             if available_templates:
                 self.template_listbox.clear()
@@ -549,154 +793,117 @@ class DocumentGeneratorApp(QMainWindow):
             self.choose_custom_templates()
 
     def process_data(self, df):
-        # Примінити співставлення
-        for required_column, mapped_column in self.column_mappings.items():
-            if mapped_column in df.columns:
-                df[required_column] = df[mapped_column]
-
-                # Як повинно бути
-                df["kod1"] = df.get("Назва групи", '')
-                df["nomer"] = df.get("Реєстраційний номер", '').apply(
-                    lambda x: str(int(x)) if isinstance(x, float) and x.is_integer() else str(x))
-                df["prot_num"] = df.get("Номер протоколу", '').apply(
-                    lambda x: str(int(x)) if isinstance(x, float) and x.is_integer() else str(x))
-
-                # Опис залишкових колонок
-                df["name1"] = df.get("Прізвище", '')
-                df["name2"] = df.get("Ім'я", '')
-                df["name3"] = df.get("По батькові", '')
-                df["adresa"] = df.get("Адреса", '')
-                df["mob_number"] = df.get("Контактний номер", '')
-                df["form_b"] = df.get("Бютжет чи контракт", '')
-                df["gr_num"] = df.get("Номер групи", '')
-                df["stupen"] = df.get("ОКР", '')
-                df["spc"] = df.get("Спеціальність", '')
-                df["num_pass"] = df.get("ДПО.Номер", '')
-                df["seria_pass"] = df.get("ДПО.Серія", '')
-                df["vydan"] = df.get("ДПО.Ким виданий", '')
-                df["nakaz"] = df.get("Наказ про зарахування", '')
-                df["ser_sv"] = df.get("Серія документа", '')
-                df["num_sv"] = df.get("Номер документа", '')
-                df["kym_vydany"] = df.get("Ким видано", '')
-                df["zno_num"] = df.get("Номер зно", '')
-                df["zno_rik"] = df.get("Рік зно", '')
-                df["forma_nav"] = df.get("Форма навчання", '')
-                df["doc_of"] = df.get("ДПО", '')
-                df["typ_doc"] = df.get("Тип документа", '')
-                df["typ_doc_dod"] = df.get("Додаток до типу документу", '')
+        # Примінити співставлення одним присвоєнням, колонки екселя залишаються для шаблонів
+        sources = {required_column: mapped_column for required_column, mapped_column in self.column_mappings.items()
+                   if mapped_column in df.columns and mapped_column != required_column}
+        if sources:
+            df[list(sources)] = df[list(sources.values())].to_numpy()
 
         # Обробка стовбців
         try:
             # Хрень від ChatGPT для include_scores вроді запрацювало співставлення
-            required_columns = {
-                "kod1": "Назва групи",
-                "nomer": "Реєстраційний номер",
-                "name1": "Прізвище",
-                "name2": "Ім'я",
-                "name3": "По батькові",
-                "adresa": "Адреса",
-                "mob_number": "Контактний номер",
-                "form_b": "Бютжет чи контракт",
-                "gr_num": "Номер групи",
-                "stupen": "ОКР",
-                "spc": "Спеціальність",
-                "num_pass": "ДПО.Номер",
-                "seria_pass": "ДПО.Серія",
-                "vydan": "ДПО.Ким виданий",
-                "nakaz": "Наказ про зарахування",
-                "ser_sv": "Серія документа",
-                "num_sv": "Номер документа",
-                "kym_vydany": "Ким видано",
-                "zno_num": "Номер зно",
-                "zno_rik": "Рік зно",
-                "forma_nav": "Форма навчання",
-                "doc_of": "ДПО",
-                "typ_doc": "Тип документа",
-                "typ_doc_dod": "Додаток до типу документу",
-                "prot_num": "Номер протоколу",
-            }
+            required_columns = dict(_TEMPLATE_COLUMNS)
 
             if self.include_scores:
                 required_columns.update({
                     f"{column.lower().rstrip('.').replace(' ', '_')}": column for column in self.selected_score_columns
                 })
 
-            # Форматування дат
-            def format_date(column_name):
-                if column_name in df:
-                    return pd.to_datetime(df[column_name], errors='coerce').dt.strftime('%d.%m.%Y')
-                else:
-                    return [''] * len(df)
-
-            df["data_sv"] = format_date("Дата видачі документа")
-            df["data_prot"] = format_date("Дата протоколу")
-            df["zayava_vid"] = format_date("Дата подачі заяви")
-            df["data"] = format_date("ДПО.Дата видачі")
-            df["data_vstup"] = format_date("Дата вступу")
-            df["data_nakaz"] = format_date("Дата наказу")
-
-            # Сьогоднішня дата
-            df["d"] = datetime.today().strftime("%d")
-            df["m"] = format_datetime(datetime.today(), "MMMM", locale='uk_UA')
-            df["Y"] = datetime.today().strftime("%Y")
-
-            # Обробка нових колонок
-            for new_column, old_column in required_columns.items():
-                if old_column in df.columns:
-                    df[new_column] = df[old_column]
+            # Форматування дат: кожна колонка розбирається окремо (свій формат), запис одним присвоєнням
+            date_src = df.reindex(columns=list(_DATE_COLUMNS.values()))  # Відсутні колонки стають NaT
+            dates = date_src.apply(pd.to_datetime, errors='coerce', cache=True)
+            formatted = dates.apply(lambda column: column.dt.strftime('%d.%m.%Y')).fillna('').to_numpy()
+            df[list(_DATE_COLUMNS)] = formatted
+
+            # Сьогоднішня дата, один виклик today() на обробку
+            today = datetime.today()
+            df["d"], df["m"], df["Y"] = today.strftime("%d"), format_datetime(today, "MMMM", locale='uk_UA'), today.strftime("%Y")
+
+            # Невизначені колонки рахуються до заповнення, інакше reindex створить їх пробілами
+            missing_columns = {new_column: old_column for new_column, old_column in required_columns.items()
+                               if old_column not in df.columns}
+
+            # Нові колонки одним проходом, відсутні заповнюються пробілом
+            df[list(required_columns)] = df.reindex(columns=list(required_columns.values()), fill_value=' ').to_numpy()
+
+            # Обробка невизначених колонок
+            stop = False  # Пропустити решту обробки (як раніше return), але колонки все одно привести до ладу
+            if missing_columns:
+                skip_warning = QMessageBox.warning(self, "Warning", "Наявні не визначені колонки пропустити?",
+                                                   QMessageBox.Yes | QMessageBox.No)
+
+                if skip_warning == QMessageBox.Yes:
+                    self.log_message("Наступні невизначені колонки пропущені.")
+                    for old_column in missing_columns.values():
+                        self.log_message(f"Колонка '{old_column}' пропущена.")
+                    stop = True
                 else:
-                    skip_warning = QMessageBox.warning(self, "Warning", "Наявні не визначені колонки пропустити?",
-                                                       QMessageBox.Yes | QMessageBox.No)
-
-                    if skip_warning == QMessageBox.Yes:
-                        self.log_message("Наступні невизначені колонки пропущені.")
-                        for new_column, old_column in required_columns.items():
-                            if old_column not in df.columns:
-                                self.log_message(f"Колонка '{old_column}' пропущена.")
-                        return
-                    for new_column, old_column in required_columns.items():
-                        if old_column in df.columns:
-                            df[new_column] = df[old_column]
-                        else:
-                            # Питання за колонки
-                            reply = QMessageBox.question(self, 'Колонка не знайдена',
-                                                         f"Колонка '{old_column}' не назначена. Хочете вибрати відповідну їй чи пропустити?",
-                                                         QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel)
-
-                            if reply == QMessageBox.Yes:
-                                # Опції співставлення
-                                available_columns = list(df.columns)
-                                mapped_column, ok = QInputDialog.getItem(self, "Співставлення",
-                                                                         f"Співставлення '{old_column}' до:",
-                                                                         available_columns, 0, False)
-                                if ok and mapped_column:
-                                    df[new_column] = df[mapped_column]
-                            elif reply == QMessageBox.No:
-                                self.log_message(f"Колонка '{old_column}' пропущена.")
-                            elif reply == QMessageBox.Cancel:
-                                self.log_message(f"Процес перерваний.")
-                                return
+                    for new_column, old_column in missing_columns.items():
+                        # Питання за колонки
+                        reply = QMessageBox.question(self, 'Колонка не знайдена',
+                                                     f"Колонка '{old_column}' не назначена. Хочете вибрати відповідну їй чи пропустити?",
+                                                     QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel)
+
+                        if reply == QMessageBox.Yes:
+                            # Опції співставлення
+                            available_columns = list(df.columns)
+                            mapped_column, ok = QInputDialog.getItem(self, "Співставлення",
+                                                                     f"Співставлення '{old_column}' до:",
+                                                                     available_columns, 0, False)
+                            if ok and mapped_column:
+                                df[new_column] = df[mapped_column]
+                        elif reply == QMessageBox.No:
+                            self.log_message(f"Колонка '{old_column}' пропущена.")
+                        elif reply == QMessageBox.Cancel:
+                            self.log_message(f"Процес перерваний.")
+                            stop = True
+                            break
+
+            # Після ручного співставлення, щоб вибрані колонки теж оброблялись
+            for new_column in ("nomer", "prot_num"):
+                df[new_column] = df[new_column].apply(
+                    lambda x: str(int(x)) if isinstance(x, float) and x.is_integer() else str(x))
+            for new_column in _CATEGORY_COLUMNS:
+                df[new_column] = df[new_column].astype('category')
+            if stop:
+                return
 
             # Логіка оцінок
             if self.include_scores:
                 for column in self.selected_score_columns:
                     if column in df.columns:
                         column_transliterated = column.lower().replace(' ', '_')
-                        df[f"{column_transliterated}_slova"] = df[column].apply(
-                            lambda x: num2words(x, lang='uk') if pd.notnull(x) and isinstance(x, (int, float)) else ''
-                        )
+                        #Слова рахуються один раз на кожну унікальну оцінку
+                        scores = df[column]
+                        words = {value: _num2words_uk(value) for value in scores.dropna().unique().tolist()
+                                 if isinstance(value, (int, float))}
+                        df[f"{column_transliterated}_slova"] = scores.map(words).fillna('')
                     else:
                         self.log_message(f"Колонка '{column}' не знайдена.")
 
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Помилка при обробці даних: {e}")
 
-    #Стройка документа
-    def create_documents(self, df, output_dir):
-        for idx, row in df.iterrows():
-            context = row.to_dict()
-            context = {key.lower().replace(' ', '_').replace('.', '').replace(',', ''): value for key, value in
-                       context.items()}
+    #Стройка документа, виконується у фоновому потоці: в ГУІ тільки через log
+    def create_documents(self, df, word_templates, output_dir, log):
+        #Шаблони читаються з диску один раз
+        templates = []
+        template_bytes = {}
+        for template_path in word_templates:
+            try:
+                with open(template_path, 'rb') as f:
+                    template_bytes[template_path] = f.read()
+            except OSError as e:
+                log(f"Проблема з прикладом {template_path}: {e}")
+                continue
+            templates.append((template_path, pathlib.Path(template_path).stem))
+
+        #Ключі контексту однакові для всіх рядків, рахуються один раз
+        keys = tuple(key.lower().translate(_KEY_NORM) for key in df.columns)
+        row_jobs = []
+        used_names = set()  #Однакові ПІБ не повинні писатись в один файл з різних процесів
+        for idx, row in zip(df.index, df.itertuples(index=False, name=None)):
+            context = dict(zip(keys, row))
 
             #Для назви документа
             name1 = context.get("прізвище", "")
@@ -705,18 +912,42 @@ class DocumentGeneratorApp(QMainWindow):
 
             # Construct the file name
             file_name = f"{name1} {name2} {name3}.docx"
-
-            for template_path in self.word_templates:
+            if file_name.casefold() in used_names:
+                file_name = f"{name1} {name2} {name3} ({idx}).docx"
+            used_names.add(file_name.casefold())
+            row_jobs.append((idx, context, file_name))
+
+        #Рендер в окремих процесах, по ядру на процес; лог пишеться з цього потоку
+        jobs_count = len(templates) * len(row_jobs)
+        if not jobs_count:
+            return  #Нема що рендерити, процеси не запускаються
+
+        #spawn на всіх платформах: fork з потоку Qt може зависнути; процесів не більше ніж документів
+        with ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, jobs_count),
+                                 mp_context=multiprocessing.get_context('spawn'), initializer=_init_render_worker,
+                                 initargs=(template_bytes,)) as executor:
+            futures = {
+                executor.submit(_render_one, template_path, context, f"{output_dir}/{template_name}_{file_name}"):
+                    (idx, template_path)
+                for template_path, template_name in templates for idx, context, file_name in row_jobs
+            }
+            #Повідомлення йдуть в ГУІ пачками, одне оновлення консолі на пачку
+            log_buffer = []
+            for future in as_completed(futures):
                 try:
-                    template_name = pathlib.Path(template_path).stem
-                    doc = DocxTemplate(template_path)
-                    doc.render(context)
-                    doc.save(f"{output_dir}/{template_name}_{file_name}")
+                    future.result()
                 except Exception as e:
-                    self.log_message(f"Проблема генерації {idx} з прикладом {template_path}: {e}")
-                    self.log_message(f"Генерація не успішна: {e}")
+                    idx, template_path = futures[future]
+                    log_buffer.append(f"Проблема генерації {idx} з прикладом {template_path}: {e}")
+                    log_buffer.append(f"Генерація не успішна: {e}")
+                    if len(log_buffer) >= 100:
+                        log('\n'.join(log_buffer))
+                        log_buffer.clear()
+            if log_buffer:
+                log('\n'.join(log_buffer))
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  #Для процесів рендеру в зібраному exe
     app = QApplication(sys.argv)
     window = DocumentGeneratorApp()
     window.show()
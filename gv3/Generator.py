@@ -1,5 +1,7 @@
+import io
 import shutil
 import sys
+import functools
 import os
 from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, \
     QListWidget, \
@@ -14,6 +16,11 @@ import pandas as pd
 import pathlib
 from transliterate import translit
 
+# Score in Ukrainian words, cached across score columns
+@functools.lru_cache(maxsize=None, typed=True)
+def _num2words_uk(value):
+    return num2words(value, lang='uk')
+
 class ScoreColumnSelectorDialog(QDialog):
     def __init__(self, excel_path, selected_sheet, parent=None):
         super().__init__(parent)
@@ -668,19 +675,20 @@ class DocumentGeneratorApp(QMainWindow):
             df["data_vstup"] = format_date("Дата вступу")
             df["data_nakaz"] = format_date("Дата наказу")
 
-            # Adding today's date in specific formats
-            df["d"] = datetime.today().strftime("%d")
-            df["m"] = format_datetime(datetime.today(), "MMMM", locale='uk_UA')
-            df["Y"] = datetime.today().strftime("%Y")
+            # Adding today's date in specific formats (read the clock once)
+            today = datetime.today()
+            df["d"], df["m"], df["Y"] = today.strftime("%d"), format_datetime(today, "MMMM", locale='uk_UA'), today.strftime("%Y")
 
             # Handling score columns if included
             if self.include_scores:
                 for column in self.selected_score_columns:
                     if column in df.columns:
                         column_transliterated = column.lower().rstrip('.').replace(' ', '_')
-                        df[f"{column_transliterated}_slova"] = df[column].apply(
-                            lambda x: num2words(x, lang='uk') if pd.notnull(x) and isinstance(x, (int, float)) else ''
-                        )
+                        # num2words once per distinct score, not per row
+                        scores = df[column]
+                        words = {value: _num2words_uk(value) for value in scores.dropna().unique().tolist()
+                                 if isinstance(value, (int, float))}
+                        df[f"{column_transliterated}_slova"] = scores.map(words).fillna('')
                     else:
                         QMessageBox.warning(self, "Warning", f"Column '{column}' not found in DataFrame.")
 
@@ -689,14 +697,26 @@ class DocumentGeneratorApp(QMainWindow):
         print(df)
 
     def create_documents(self, df, output_dir):
+        contexts = []
         for idx, row in df.iterrows():
             context = row.to_dict()
             context = {key.lower().replace(' ', '_').replace('.', '').replace(',', ''): value for key, value in
                        context.items()}
-            for template_path in self.word_templates:
+            contexts.append((idx, context))
+
+        for template_path in self.word_templates:
+            # Read each template from disk once; render always starts from a fresh in-memory copy
+            try:
+                template_name = pathlib.Path(template_path).stem
+                with open(template_path, 'rb') as f:
+                    template_bytes = f.read()
+            except Exception as e:
+                self.log_message(f"Error reading template {template_path}: {e}")
+                continue
+
+            for idx, context in contexts:
                 try:
-                    template_name = pathlib.Path(template_path).stem
-                    doc = DocxTemplate(template_path)
+                    doc = DocxTemplate(io.BytesIO(template_bytes))
                     doc.render(context)
                     doc.save(f"{output_dir}/{template_name}_{context.get('реєстраційний_номер', idx)}.docx")
                 except Exception as e: